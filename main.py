@@ -1,36 +1,146 @@
 from __future__ import annotations
 
 import asyncio
+import atexit
 import os
 import re
 import sys
 import threading
+import time
 import webbrowser
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse
 import base64
+import html as _html
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
 
 FIGURINIFY_URL = "https://andytwoods.github.io/Figurinify/"
-
-
-@dataclass
+UI_DRAIN_MS = 33  # ~30 Hz ui refresh for worker updates
+
+# shared session so the page fetch and the .glb download reuse pooled keep-alive connections
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers.update({"User-Agent": "Mozilla/5.0 (compatible; GLB-Downloader/1.0)"})
+atexit.register(SESSION.close)
+
+_MODEL_ID_RE = re.compile(r"(v2-[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12})", re.IGNORECASE)
+# one pass over the raw page bytes for all three .glb link shapes:
+#   abs     – absolute url like "https://cdn/x/model.glb"
+#   rootrel – root-absolute like "/assets/model.glb"
+#   rel     – truly relative like "assets/model.glb" referenced in href/src
+_COMBINED_GLB_RE = re.compile(
+    rb"(?P<abs>https?://[^\s\"']+?\.glb(?:\?[^\s\"']+)?)"
+    rb"|(?P<rootrel>/[^\s\"']+?\.glb(?:\?[^\s\"']+)?)"
+    rb"|(?:href|src)=[\"'](?!https?://)(?P<rel>[^\"']+?\.glb(?:\?[^\"']+)?)[\"']",
+    re.IGNORECASE,
+)
+# page scan reads this much at a time and gives up after the cap
+_PAGE_SCAN_CHUNK = 64 * 1024
+_PAGE_SCAN_MAX = 4 * 1024 * 1024
+# no match crosses a quote, except an href="/src=" value starting at one – used to resume the page scan
+_SCAN_QUOTES = (b'"', b"'")
+# double-escaped (\\u0026) and single-escaped (\u0026) unicode sequences in one pass
+_U_ESCAPE_RE = re.compile(r"\\{1,2}u([0-9a-fA-F]{4})")
+
+
+@dataclass(slots=True, frozen=True)
 class Resolved:
     glb_url: str
     filename: str
 
 
+# resolved links keyed on the stripped user input; short ttl so signed cdn urls don't go stale
+_RESOLVE_CACHE_MAX = 128
+_RESOLVE_CACHE_TTL = 10 * 60  # seconds
+_resolve_cache: OrderedDict[str, tuple[float, Resolved]] = OrderedDict()
+_resolve_cache_lock = threading.Lock()
+
+
 def _is_url(s: str) -> bool:
+    # http(s) scheme followed by a non-empty host – same answer as urlparse, without the parse
+    scheme, sep, rest = s.partition("://")
+    return bool(sep) and scheme.lower() in ("http", "https") and rest[:1] not in ("", "/", "?", "#")
+
+
+def _u_repl(m: re.Match) -> str:
     try:
-        u = urlparse(s)
-        return u.scheme in ("http", "https") and bool(u.netloc)
-    except Exception:
+        return chr(int(m.group(1), 16))
+    except ValueError:
+        return m.group(0)
+
+
+def _normalize_found_url(raw: str) -> str:
+    """
+    normalize possibly escaped/encoded GLB URLs extracted from HTML/JSON
+    """
+    # fast path – direct CDN links carry no escapes or entities, nothing to undo
+    if "\\" not in raw and "&" not in raw:
+        return raw.strip()
+
+    s = raw.strip()
+    # Remove a single trailing backslash that sometimes appears in JSON strings
+    if s.endswith("\\") and not s.endswith("\\\\"):
+        s = s[:-1]
+
+    # First, unescape common JSON escape sequences
+    s = s.replace("\\/", "/").replace("\\\"", '"')
+    # Reduce double backslashes to single where appropriate (but avoid killing URL backslashes in schemes)
+    s = s.replace("\\\\", "\\")
+
+    # Convert double- and single-escaped unicode sequences like \\u0026 / \u0026 -> &
+    if "\\u" in s:
+        s = _U_ESCAPE_RE.sub(_u_repl, s)
+
+    # HTML-unescape entities like &amp; -> &
+    s = _html.unescape(s)
+
+    # Final cleanup of whitespace
+    s = s.strip()
+    return s
+
+
+def _match_is_final(buf: bytearray, m: re.Match) -> bool:
+    """
+    True if reading more of the page can't change this page-scan match: something follows it,
+    that isn't a lone trailing "?" whose query string is still to come, and no href="/src="
+    value opened before it is still unclosed
+    """
+    end = m.end()
+    if end == len(buf) or (end + 1 == len(buf) and buf[end] == ord("?")):
         return False
+    # any later quote settles every href="/src=" value opened before the match
+    if any(buf.find(q, m.start()) >= 0 for q in _SCAN_QUOTES):
+        return True
+    # otherwise an earlier value still waiting for its closing quote could match further left
+    last = max(buf.rfind(q, 0, m.start()) for q in _SCAN_QUOTES)
+    return last < 0 or not _opens_rel_value(buf, last)
+
+
+def _opens_rel_value(buf: bytearray, quote_at: int) -> bool:
+    return buf[max(0, quote_at - 5):quote_at].lower().endswith((b"href=", b"src="))
+
+
+def _resume_offset(buf: bytearray, start: int) -> int:
+    """
+    where the next page-scan search can start, given buf[start:] held no complete match:
+    the last quote, backed off 5 bytes so an href="/src=' prefix is still seen
+    """
+    last = max(buf.rfind(q, start) for q in _SCAN_QUOTES)
+    return start if last < 0 else max(start, last - 5)
 
 
 def _guess_filename_from_url(url: str) -> str:
@@ -48,7 +158,7 @@ def _extract_model_id(text: str) -> Optional[str]:
     best-effort: pulls a model id like:
     v2-019a7474-3f2a-7a7d-9282-cc5599095a44
     """
-    m = re.search(r"(v2-[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12})", text, re.IGNORECASE)
+    m = _MODEL_ID_RE.search(text)
     return m.group(1) if m else None
 
 
@@ -58,8 +168,36 @@ def resolve_to_glb_url(user_input: str, log) -> Resolved:
     1) direct .glb url
     2) any url that contains a .glb url in its html (best-effort)
     3) model page built from a detected model id, then scan html for .glb
+
+    results are cached for a few minutes so re-downloading the same link skips the page fetch.
     """
     s = user_input.strip()
+    now = time.monotonic()
+
+    with _resolve_cache_lock:
+        hit = _resolve_cache.get(s)
+        if hit is not None and now - hit[0] < _RESOLVE_CACHE_TTL:
+            _resolve_cache.move_to_end(s)
+            log(f"using cached link for – {s}")
+            return hit[1]
+
+    resolved = _resolve_uncached(s, log)
+
+    with _resolve_cache_lock:
+        _resolve_cache[s] = (now, resolved)
+        _resolve_cache.move_to_end(s)
+        while len(_resolve_cache) > _RESOLVE_CACHE_MAX:
+            _resolve_cache.popitem(last=False)
+    return resolved
+
+
+def _forget_resolved(user_input: str) -> None:
+    """drop a cached link, e.g. after its download failed, so the next try resolves afresh"""
+    with _resolve_cache_lock:
+        _resolve_cache.pop(user_input.strip(), None)
+
+
+def _resolve_uncached(s: str, log) -> Resolved:
 
     # 1) direct .glb
     if _is_url(s) and s.lower().split("?")[0].endswith(".glb"):
@@ -68,90 +206,49 @@ def resolve_to_glb_url(user_input: str, log) -> Resolved:
     # helper: fetch page + scan for glb url
     def scan_page_for_glb(page_url: str) -> Optional[str]:
         log(f"fetching page to look for a .glb link – {page_url}")
-        r = requests.get(
-            page_url,
-            timeout=30,
-            headers={
-                "User-Agent": "Mozilla/5.0 (compatible; GLB-Downloader/1.0)"
-            },
-            allow_redirects=True,
-        )
-        r.raise_for_status()
-        html = r.text
-
-        # helper to normalize possibly escaped/encoded GLB URLs extracted from HTML/JSON
-        def _normalize_found_url(raw: str) -> str:
-            import re as _re
-            try:
-                s = raw.strip()
-                # Remove a single trailing backslash that sometimes appears in JSON strings
-                if s.endswith("\\") and not s.endswith("\\\\"):
-                    s = s[:-1]
-
-                # First, unescape common JSON escape sequences
-                s = s.replace("\\/", "/").replace("\\\"", '"')
-                # Reduce double backslashes to single where appropriate (but avoid killing URL backslashes in schemes)
-                s = s.replace("\\\\", "\\")
-
-                # Convert double-escaped unicode sequences like \\u0026 -> &
-                def _u_repl(m):
-                    try:
-                        return chr(int(m.group(1), 16))
-                    except Exception:
-                        return m.group(0)
-                s = _re.sub(r"\\\\u([0-9a-fA-F]{4})", _u_repl, s)
-
-                # Then convert single-escaped unicode sequences like \u0026 -> &
-                s = _re.sub(r"\\u([0-9a-fA-F]{4})", _u_repl, s)
-
-                # HTML-unescape entities like &amp; -> &
-                try:
-                    import html as _html
-                    s = _html.unescape(s)
-                except Exception:
-                    pass
-
-                # Final cleanup of whitespace
-                s = s.strip()
-                return s
-            except Exception:
-                return raw
-
-        # look for absolute .glb urls first
-        candidates = re.findall(r"https?://[^\s\"']+?\.glb(?:\?[^\s\"']+)?", html, flags=re.IGNORECASE)
-        if candidates:
-            norm = _normalize_found_url(candidates[0])
-            if norm != candidates[0]:
-                log(f"normalized url: {candidates[0]} -> {norm}")
-            return norm
-
-        # occasionally a relative path might appear – this is a fallback
-        # use urljoin to correctly resolve both root-absolute and page-relative links
-        from urllib.parse import urljoin
-
-        # 2a) root-absolute like "/assets/model.glb"
-        rel = re.findall(r"(/[^\s\"']+?\.glb(?:\?[^\s\"']+)?)", html, flags=re.IGNORECASE)
-        if rel:
-            joined = urljoin(r.url, rel[0])
-            norm = _normalize_found_url(joined)
-            if norm != joined:
-                log(f"normalized url: {joined} -> {norm}")
-            return norm
-
-        # 2b) truly relative like "assets/model.glb" referenced in href/src
-        rel2 = re.findall(
-            r"(?:href|src)=[\"'](?!https?://)([^\"']+?\.glb(?:\?[^\"']+)?)[\"']",
-            html,
-            flags=re.IGNORECASE,
-        )
-        if rel2:
-            joined = urljoin(r.url, rel2[0])
-            norm = _normalize_found_url(joined)
-            if norm != joined:
-                log(f"normalized url: {joined} -> {norm}")
-            return norm
-        
-        return None
+        # stream the raw bytes and stop reading as soon as a link turns up
+        with SESSION.get(page_url, stream=True, timeout=30, allow_redirects=True) as r:
+            r.raise_for_status()
+            page_base = r.url
+            buf = bytearray()
+            m = None
+            seen_glb = False
+            scan_from = 0
+            for part in r.iter_content(_PAGE_SCAN_CHUNK):
+                probe_from = max(0, len(buf) - 3)  # ".glb" may straddle the chunk boundary
+                buf += part
+                # cheap substring probe – pages that never mention .glb never reach the regex
+                if not seen_glb:
+                    seen_glb = b".glb" in buf[probe_from:].lower()
+                if seen_glb:
+                    # the first .glb link on the page wins, whatever its shape
+                    m = _COMBINED_GLB_RE.search(buf, scan_from)
+                    # a match at the very end of the buffer may be cut off mid-url – read more first
+                    if m and _match_is_final(buf, m):
+                        break
+                # nothing conclusive yet – the next search only needs to cover the tail
+                resume = _resume_offset(buf, scan_from)
+                scan_from = min(resume, m.start()) if m else resume
+                if len(buf) >= _PAGE_SCAN_MAX:
+                    # a match still open at the cap may be truncated – don't hand it out
+                    m = None
+                    log(f"page is very large – stopped looking after {_PAGE_SCAN_MAX // (1024 * 1024)} MiB")
+                    break
+
+        if not m:
+            return None
+
+        if m.group("abs") is not None:
+            raw = m.group("abs").decode("utf-8", "replace")
+        else:
+            # relative path – use urljoin to correctly resolve both root-absolute and page-relative links
+            rel = (m.group("rootrel") or m.group("rel")).decode("utf-8", "replace")
+            raw = urljoin(page_base, rel)
+
+        norm = _normalize_found_url(raw)
+        if norm != raw:
+            log(f"normalized url: {raw} -> {norm}")
+        return norm
 
     # 2) user pasted a normal url (maybe a model page)
     if _is_url(s):
@@ -180,24 +277,33 @@ def resolve_to_glb_url(user_input: str, log) -> Resolved:
 def download_file(url: str, out_path: Path, progress_cb, log) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with requests.get(url, stream=True, timeout=60, allow_redirects=True) as r:
+    # .glb is already binary – ask for it uncompressed so content-length matches the bytes we read
+    with SESSION.get(
+        url,
+        stream=True,
+        timeout=60,
+        allow_redirects=True,
+        headers={"Accept-Encoding": "identity"},
+    ) as r:
         r.raise_for_status()
         total = int(r.headers.get("content-length") or 0)
         got = 0
+        last_pct = -1
 
         with open(out_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 512):
-                if not chunk:
-                    continue
+            for chunk in r.iter_content(chunk_size=1024 * 1024):
                 f.write(chunk)
                 got += len(chunk)
 
                 if total > 0:
                     pct = int(got * 100 / total)
-                    progress_cb(pct)
                 else:
-                    # unknown size – just pulse a little
-                    progress_cb(min(99, (got // (1024 * 1024)) % 100))
+                    # unknown size – just pulse a little (changes once per MiB)
+                    pct = min(99, (got // (1024 * 1024)) % 100)
+                # only push to the ui when the value actually changes
+                if pct != last_pct:
+                    last_pct = pct
+                    progress_cb(pct)
 
     progress_cb(100)
     log(f"saved – {out_path}")
@@ -267,23 +373,56 @@ class TkDownloaderApp(tk.Tk):
         # Menu (optional minimal)
         self.create_menus()
 
+        # Pending ui updates from any thread, applied by _drain on the Tk thread (~30 Hz)
+        self._pending: deque[tuple[str, object]] = deque()
+        self.after(UI_DRAIN_MS, self._drain)
+
         # Make sure the window becomes visible and focused (helps on macOS)
         self.after(150, self._force_focus)
 
-    # UI helpers
+    # UI helpers – safe to call from any thread; deque appends are atomic
     def log(self, msg: str) -> None:
-        def append():
-            self.log_text.configure(state="normal")
-            self.log_text.insert("end", msg + "\n")
-            self.log_text.see("end")
-            self.log_text.configure(state="disabled")
-        self.after(0, append)
+        self._pending.append(("log", msg))
 
     def set_status(self, msg: str) -> None:
-        self.after(0, lambda: self.status_var.set(msg))
+        self._pending.append(("status", msg))
 
     def set_progress(self, pct: int) -> None:
-        self.after(0, lambda: self.progress_var.set(pct))
+        self._pending.append(("progress", pct))
+
+    def set_download_enabled(self, enabled: bool) -> None:
+        self._pending.append(("download_enabled", enabled))
+
+    def _drain(self) -> None:
+        try:
+            lines = []
+            status = progress = download_enabled = None
+            while self._pending:
+                kind, value = self._pending.popleft()
+                if kind == "log":
+                    lines.append(value)
+                elif kind == "status":
+                    status = value
+                elif kind == "progress":
+                    progress = value
+                elif kind == "download_enabled":
+                    download_enabled = value
+            # one text widget mutation per tick, however many lines arrived
+            if lines:
+                self.log_text.configure(state="normal")
+                self.log_text.insert("end", "\n".join(lines) + "\n")
+                self.log_text.see("end")
+                self.log_text.configure(state="disabled")
+            # only the latest status / progress of this tick is worth drawing
+            if status is not None:
+                self.status_var.set(status)
+            if progress is not None:
+                self.progress_var.set(progress)
+            if download_enabled is not None:
+                self.btn_download.configure(state=tk.NORMAL if download_enabled else tk.DISABLED)
+        finally:
+            # keep polling even if a widget call failed (e.g. a TclError during teardown)
+            self.after(UI_DRAIN_MS, self._drain)
 
     # Actions
     def on_quit(self) -> None:
@@ -339,7 +478,12 @@ class TkDownloaderApp(tk.Tk):
                 def progress_cb(pct: int) -> None:
                     self.set_progress(pct)
 
-                download_file(resolved.glb_url, out_path, progress_cb, self.log)
+                try:
+                    download_file(resolved.glb_url, out_path, progress_cb, self.log)
+                except Exception:
+                    # the link may have expired or been rejected – resolve again on retry
+                    _forget_resolved(s)
+                    raise
 
                 self.set_status(f"download complete – {out_path.name}")
                 self.log("download complete – open Figurinify and use the site’s file picker to load your model.")
@@ -348,11 +492,9 @@ class TkDownloaderApp(tk.Tk):
                 self.log(f"error – {e}")
             finally:
                 # re-enable button
-                try:
-                    self.after(0, lambda: self.btn_download.configure(state=tk.NORMAL))
-                except Exception:
-                    pass
+                self.set_download_enabled(True)
 
+        # daemon thread so closing the window mid-download quits straight away
         t = threading.Thread(target=worker, daemon=True)
         t.start()
 